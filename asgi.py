@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+asgi.py
+
+Production entrypoint for the /get-aws-creds API (instead of app.run).
+The endpoint is async and pushes blocking boto3 calls to threads, so a few
+workers handle many in-flight requests:
+
+    hypercorn -w 2 -b 0.0.0.0:5000 asgi:app
+"""
+
+from flask_endpoint import app
+
+if __name__ == "__main__":
+    app.run(host='0.0.0.0', port=5000, debug=False)
@@ -2,33 +2,61 @@
 """
 create_account.py
 
-- Importable function: create_member_account(...)
+- Importable functions: create_member_account(...), create_member_accounts([...])
 - CLI mode for testing: python3 create_account.py ...
 - Uses role temp creds + OU lookup + account creation + move
 """
 
-import json
+import re
 import time
+import random
 import sys
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
-import boto3
+import orjson
 from botocore.exceptions import ClientError
 
 # ----------------------------------------------------------------------
 # Import the helper that gives us temp role credentials
 # ----------------------------------------------------------------------
 from credential_and_role import setup_org_and_get_creds
+from ou_lookup import (
+    get_root_id, get_ou_index, lookup_ou_id, invalidate_ou_index, OU_PAGE_SIZE
+)
+
+# Status polling: exponential backoff with ±20% jitter
+POLL_INITIAL_DELAY = 2.0   # seconds
+POLL_BACKOFF_FACTOR = 1.7
+POLL_MAX_DELAY = 15.0      # seconds
+
+# AWS Organizations allows at most 5 CreateAccount operations in flight per org
+MAX_CONCURRENT_CREATES = 5
+_CREATE_SLOTS = threading.Semaphore(MAX_CONCURRENT_CREATES)
+
+# CreateAccountRequestId inside a "still finalizing" error message
+_FINALIZING_RE = re.compile(r"(car-[a-z0-9]{8,32})")
 
 
 # ----------------------------------------------------------------------
 # 1. Resolve OU ID (shared helper)
 # ----------------------------------------------------------------------
-def resolve_ou_id(org_client, *, ou_name: str = None, ou_id: str = None) -> str:
+def resolve_ou_id(
+    org_client,
+    *,
+    ou_name: str = None,
+    ou_id: str = None,
+    root_id: str = None,
+    cache_key: str = None,
+) -> str:
     """
     Return the OU ID.
     - If ou_id → return it directly
-    - If ou_name → search under root
+    - If ou_name + cache_key → look it up anywhere in the cached OU tree index,
+      rebuilt once on a miss (ValueError if the name is used by more than one
+      OU at the same depth)
+    - If ou_name only → search directly under root, stopping at the first match
     - Else → raise clear error
     """
     if ou_id:
@@ -37,10 +65,16 @@ def resolve_ou_id(org_client, *, ou_name: str = None, ou_id: str = None) -> str:
     if not ou_name:
         raise ValueError("Either ou_name or ou_id must be provided")
 
-    root_id = org_client.list_roots()["Roots"][0]["Id"]
+    if cache_key:
+        return lookup_ou_id(org_client, cache_key, ou_name)
+
+    # Uncached: stop paging as soon as the name matches
+    root_id = root_id or org_client.list_roots()["Roots"][0]["Id"]
     paginator = org_client.get_paginator("list_organizational_units_for_parent")
 
-    for page in paginator.paginate(ParentId=root_id):
+    for page in paginator.paginate(
+        ParentId=root_id, PaginationConfig={"PageSize": OU_PAGE_SIZE}
+    ):
         for ou in page.get("OrganizationalUnits", []):
             if ou["Name"] == ou_name:
                 return ou["Id"]
@@ -60,77 +94,133 @@ def create_member_account(
     _debug: bool = False
 ) -> Dict[str, Any]:
     
-    if not account_name or not account_email or not ou:
-        raise ValueError("account_name, account_email, and ou are required")
+    _require_account_args(account_name, account_email, ou)
 
     # 1. Get temp role credentials
-    creds = setup_org_and_get_creds(role_name)
+    creds = setup_org_and_get_creds(role_name, with_session=True)
     if _debug:
         print(f"Assuming role: {creds['role_arn']}")
 
-    session = boto3.Session(
-        aws_access_key_id=creds["access_key_id"],
-        aws_secret_access_key=creds["secret_access_key"],
-        aws_session_token=creds["session_token"],
-        region_name="us-east-1",
+    creds.pop("session")
+    org_client = creds.pop("client")
+    root_id = get_root_id(org_client, creds["account_id"])
+
+    return _create_member_account(
+        org_client, creds, root_id,
+        account_name, account_email, ou, role_name,
+        _debug=_debug,
     )
-    org_client = session.client("organizations")
 
-    # 2. Resolve OU – auto-detect if it's ID or name
+
+def _ou_exists(org_client, ou_id: str) -> bool:
+    try:
+        org_client.describe_organizational_unit(OrganizationalUnitId=ou_id)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "OrganizationalUnitNotFoundException":
+            return False
+        raise
+    return True
+
+
+def _require_account_args(account_name, account_email, ou) -> None:
+    if not account_name or not account_email or not ou:
+        raise ValueError("account_name, account_email, and ou are required")
+
+
+def _create_member_account(
+    org_client,
+    creds: Dict[str, Any],
+    root_id: str,
+    account_name: str,
+    account_email: str,
+    ou: str,
+    role_name: str,
+    *,
+    _debug: bool = False
+) -> Dict[str, Any]:
+    """
+    Steps 2-6 of create_member_account with an existing (thread-safe) client,
+    so batch workers can share one client instead of each building their own.
+    """
+    _require_account_args(account_name, account_email, ou)
+    cache_key = creds["account_id"]
+
+    # 2. Resolve OU – auto-detect if it's ID or name – and make sure it still
+    #    exists, so a stale cache can't strand the new account in the root
     try:
         # Try as ID first (starts with "ou-")
         if ou.startswith("ou-") and len(ou) > 10:
             target_ou_id = ou
+            if not _ou_exists(org_client, target_ou_id):
+                raise ValueError(f"OU ID '{ou}' does not exist")
             if _debug:
                 print(f"Using OU ID: {target_ou_id}")
         else:
-            target_ou_id = resolve_ou_id(org_client, ou_name=ou)
+            target_ou_id = resolve_ou_id(
+                org_client, ou_name=ou, root_id=root_id, cache_key=cache_key
+            )
+            if not _ou_exists(org_client, target_ou_id):
+                # Cached ID was deleted since the index was built → rebuild once
+                invalidate_ou_index(cache_key)
+                target_ou_id = resolve_ou_id(
+                    org_client, ou_name=ou, root_id=root_id, cache_key=cache_key
+                )
+                if not _ou_exists(org_client, target_ou_id):
+                    raise ValueError(f"OU '{ou}' ({target_ou_id}) does not exist")
             if _debug:
                 print(f"Resolved OU name '{ou}' → ID: {target_ou_id}")
     except Exception as e:
         raise ValueError(f"Cannot resolve OU '{ou}': {e}")
 
-    # 3. Start account creation
-    try:
-        resp = org_client.create_account(
-            Email=account_email,
-            AccountName=account_name,
-            RoleName=role_name,
-            IamUserAccessToBilling="ALLOW",
-        )
-        create_id = resp["CreateAccountStatus"]["Id"]
-        if _debug:
-            print(f"Creation started: {create_id}")
-    except ClientError as e:
-        if "Finalizing" in str(e):
-            create_id = str(e).split()[-1]
+    # 3-4. Create + wait, holding one of the org's concurrent-create slots
+    with _CREATE_SLOTS:
+        # 3. Start account creation
+        try:
+            resp = org_client.create_account(
+                Email=account_email,
+                AccountName=account_name,
+                RoleName=role_name,
+                IamUserAccessToBilling="ALLOW",
+            )
+            create_id = resp["CreateAccountStatus"]["Id"]
+            if _debug:
+                print(f"Creation started: {create_id}")
+        except ClientError as e:
+            error = e.response["Error"]
+            match = (
+                error.get("Code") == "ConcurrentModificationException"
+                and "Finalizing" in error.get("Message", "")
+                and _FINALIZING_RE.search(error["Message"])
+            )
+            if not match:
+                raise
+            create_id = match.group(1)
             if _debug:
                 print(f"Creation already in progress: {create_id}")
-        else:
-            raise
 
-    # 4. Wait for completion
-    if _debug:
-        print("Waiting for account to be ready...")
-    while True:
-        status = org_client.describe_create_account_status(CreateAccountRequestId=create_id)
-        state = status["CreateAccountStatus"]["State"]
+        # 4. Wait for completion
         if _debug:
-            print(f"   → {state}", end="")
-        if state == "SUCCEEDED":
-            account_id = status["CreateAccountStatus"]["AccountId"]
+            print("Waiting for account to be ready...")
+        delay = POLL_INITIAL_DELAY
+        while True:
+            status = org_client.describe_create_account_status(CreateAccountRequestId=create_id)
+            state = status["CreateAccountStatus"]["State"]
             if _debug:
-                print(f" → Account ID: {account_id}")
-            break
-        if state == "FAILED":
-            reason = status["CreateAccountStatus"].get("FailureReason", "Unknown")
-            raise RuntimeError(f"Account creation failed: {reason}")
-        if _debug:
-            print()
-        time.sleep(6)
+                print(f"   → {state}", end="")
+            if state == "SUCCEEDED":
+                account_id = status["CreateAccountStatus"]["AccountId"]
+                if _debug:
+                    print(f" → Account ID: {account_id}")
+                break
+            if state == "FAILED":
+                reason = status["CreateAccountStatus"].get("FailureReason", "Unknown")
+                raise RuntimeError(f"Account creation failed: {reason}")
+            if _debug:
+                print()
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(POLL_MAX_DELAY, delay * POLL_BACKOFF_FACTOR)
 
     # 5. Move to OU
-    root_id = org_client.list_roots()["Roots"][0]["Id"]
     if _debug:
         print(f"Moving {account_id} → OU {target_ou_id}")
     org_client.move_account(
@@ -152,7 +242,52 @@ def create_member_account(
 
 
 # ----------------------------------------------------------------------
-# 3. CLI MODE – for testing
+# 3. Batch creation – several accounts in parallel
+# ----------------------------------------------------------------------
+def create_member_accounts(
+    specs: List[Dict[str, str]],
+    role_name: str = "OrgAdminRole",
+) -> List[Dict[str, Any]]:
+    """
+    Create many accounts concurrently (up to MAX_CONCURRENT_CREATES at a time).
+    - specs: [{"account_name": ..., "account_email": ..., "ou": ...}, ...]
+    - Returns one entry per spec, in order: the create_member_account result,
+      or {"account_name", "account_email", "error"} if that account failed
+    """
+    if not specs:
+        return []
+
+    # Warm the OU caches once so workers don't race to fill them
+    creds = setup_org_and_get_creds(role_name, with_session=True)
+    creds.pop("session")
+    org_client = creds.pop("client")
+    root_id = get_root_id(org_client, creds["account_id"])
+    if any(
+        isinstance(spec.get("ou"), str) and not spec["ou"].startswith("ou-")
+        for spec in specs
+    ):
+        get_ou_index(org_client, creds["account_id"])
+
+    def _create(spec):
+        try:
+            return _create_member_account(
+                org_client, creds, root_id,
+                spec.get("account_name"), spec.get("account_email"), spec.get("ou"),
+                role_name,
+            )
+        except Exception as e:
+            return {
+                "account_name": spec.get("account_name"),
+                "account_email": spec.get("account_email"),
+                "error": str(e),
+            }
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CREATES) as executor:
+        return list(executor.map(_create, specs))
+
+
+# ----------------------------------------------------------------------
+# 4. CLI MODE – for testing
 # ----------------------------------------------------------------------
 if __name__ == "__main__":
 
@@ -177,7 +312,8 @@ if __name__ == "__main__":
             _debug=True  # show progress
         )
         print("\nSUCCESS! Account created and moved to OU.\n")
-        print(json.dumps(result, indent=2, default=str))
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_INDENT_2) + b"\n")
     except Exception as e:
         print(f"\nERROR: {e}", file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
@@ -1,7 +1,10 @@
 from credential_and_role import setup_org_and_get_creds
-import boto3
+from ou_lookup import (
+    get_root_id, lookup_ou_id, cached_ou_id, refresh_ou_map, remember_ou
+)
 from botocore.exceptions import ClientError
-import json
+import orjson
+import sys
 
 def create_organizational_unit(
     ou_name: str,
@@ -33,52 +36,44 @@ def create_organizational_unit(
         role_name = role_name or "OrgAdminRole"
 
     # 2. Get temp credentials for the role
-    creds = setup_org_and_get_creds(role_name)
+    creds = setup_org_and_get_creds(role_name, with_session=True)
 
-    # 3. Create session with temp creds
-    session = boto3.Session(
-        aws_access_key_id=creds['access_key_id'],
-        aws_secret_access_key=creds['secret_access_key'],
-        aws_session_token=creds['session_token'],
-        region_name='us-east-1'
-    )
-    org_client = session.client('organizations')
+    # 3. Client from the shared auto-refreshing session for this role
+    creds.pop('session')
+    org_client = creds.pop('client')
 
-    # 4. Determine parent ID
+    # 4. Determine parent ID (root + OU names are cached per organization)
+    cache_key = creds['account_id']
     if parent_ou_id:
         parent_id = parent_ou_id
     elif parent_ou_name:
-    # look up the OU ID by name under the root
-        roots = org_client.list_roots()['Roots']
-        root_id = roots[0]['Id']
-    # List all OUs under the root (or you could allow deeper nesting if needed)
-        ous = org_client.list_organizational_units_for_parent(ParentId=root_id)['OrganizationalUnits']
-        parent_ou = next((ou for ou in ous if ou['Name'] == parent_ou_name), None)
-        if not parent_ou:
-            raise ValueError(f"Parent OU named '{parent_ou_name}' not found under root")
-        parent_id = parent_ou['Id']
+    # look up the OU ID by name anywhere in the OU tree
+        try:
+            parent_id = lookup_ou_id(org_client, cache_key, parent_ou_name)
+        except ValueError as e:
+            raise ValueError(f"Parent OU: {e}")
     else:
     # default to root
-        roots = org_client.list_roots()['Roots']
-        parent_id = roots[0]['Id']
+        parent_id = get_root_id(org_client, cache_key)
 
 
-    # 5. Create OU
-    try:
-        response = org_client.create_organizational_unit(
-            ParentId=parent_id,
-            Name=ou_name
-        )
-        ou = response['OrganizationalUnit']
-        ou_id = ou['Id']
-    except ClientError as e:
-        if 'DuplicateOrganizationalUnitNameException' in str(e):
-            # Reuse existing
-            ous = org_client.list_organizational_units_for_parent(ParentId=parent_id)['OrganizationalUnits']
-            existing = next((ou for ou in ous if ou['Name'] == ou_name), None)
-            ou_id = existing['Id'] if existing else None
-        else:
-            raise
+    # 5. Create OU (skipped when the cache already knows it exists)
+    ou_id = cached_ou_id(cache_key, parent_id, ou_name)
+    if not ou_id:
+        try:
+            response = org_client.create_organizational_unit(
+                ParentId=parent_id,
+                Name=ou_name
+            )
+            ou = response['OrganizationalUnit']
+            ou_id = ou['Id']
+            remember_ou(cache_key, parent_id, ou_name, ou_id)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'DuplicateOrganizationalUnitNameException':
+                # Reuse existing – cache was cold or stale, refresh it once
+                ou_id = refresh_ou_map(org_client, cache_key, parent_id).get(ou_name)
+            else:
+                raise
 
     # 6. Return full result
     result = creds.copy()
@@ -107,4 +102,4 @@ if __name__ == "__main__":
         role_name=args.role
     )
 
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_INDENT_2) + b"\n")
\ No newline at end of file
@@ -1,45 +1,121 @@
 #!/usr/bin/env python3
 
 
+import os
 import sys
 import json
+import functools
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+import botocore.session
 from botocore.config import Config
+from botocore.credentials import RefreshableCredentials
 from botocore.exceptions import ClientError
 # from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
+# Temp credentials are reused until they get close to expiry.
+SESSION_DURATION = 3600   # seconds, STS AssumeRole session length
+MIN_VALIDITY = 300        # seconds, never hand out creds closer than this to expiry
+
+_CREDS_CACHE = {}         # role_name -> (result_dict, expiry_epoch)
+_CREDS_LOCK = threading.Lock()
+
+_SESSIONS = {}            # role_name -> (boto3.Session backed by RefreshableCredentials,
+                          #              its Organizations client)
+_SESSIONS_LOCK = threading.Lock()
+
+ORG_POLICY_ARN = 'arn:aws:iam::aws:policy/AWSOrganizationsFullAccess'
+
+_KNOWN_ROLES = set()      # role names already confirmed to exist in IAM
+
+# Waits (seconds) between attach_role_policy retries while a new role propagates
+ATTACH_RETRY_DELAYS = (0, 1, 2, 4, 8)
+
+# Who may assume newly created roles; "{account_id}" is filled in at setup time
+# (an empty ROLE_TRUST_PRINCIPAL in .env falls back to the default too)
+DEFAULT_TRUST_PRINCIPAL = (
+    os.getenv('ROLE_TRUST_PRINCIPAL')
+    or "arn:aws:iam::123456789012:user/org-admin-user"
+)
+
+# Shared pool for the independent preflight calls in setup_org_and_get_creds
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Shared by every client: a bigger keep-alive connection pool so polling and
+# batch work reuse TLS connections instead of re-handshaking
+CLIENT_CONFIG = Config(
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+    read_timeout=30,
+    connect_timeout=30,
+    max_pool_connections=50,
+    tcp_keepalive=True
+)
+
+@functools.lru_cache(maxsize=None)
 def get_client(service, region=None):
-    config = Config(
-        region_name=region or 'us-east-1',
-        retries={'max_attempts': 10, 'mode': 'standard'},
-        read_timeout=30,
-        connect_timeout=30
-    )
+    # Clients are thread-safe and expensive to build → one per (service, region)
+    config = CLIENT_CONFIG.merge(Config(region_name=region or 'us-east-1'))
     return boto3.client(service, config=config)
 
-def setup_org_and_get_creds(role_name: str) -> dict:
+def _cached_creds(role_name: str):
+    entry = _CREDS_CACHE.get(role_name)
+    if entry and entry[1] - time.time() > MIN_VALIDITY:
+        return entry[0]
+    return None
+
+def setup_org_and_get_creds(
+    role_name: str,
+    trust_principal: str = None,
+    with_session: bool = False
+) -> dict:
     """
     Creates org + IAM role + assumes it → returns temp credentials as dict.
+    Results are cached per role until MIN_VALIDITY seconds before expiry.
+    trust_principal (only used when the role is created) defaults to
+    DEFAULT_TRUST_PRINCIPAL and may contain "{account_id}".
+    with_session=True adds "session": the role's shared auto-refreshing
+    boto3.Session, and "client": its shared Organizations client (neither is
+    JSON-serializable — pop them before printing/returning). Use the client
+    from several threads; don't call session.client() concurrently.
     """
     if not role_name or not isinstance(role_name, str):
         raise ValueError("role_name must be a non-empty string")
 
-    sts_client = get_client('sts')
-    org_client = get_client('organizations', 'us-east-1')
-    iam_client = get_client('iam')
+    result = _get_creds(role_name, trust_principal)
+    if with_session:
+        result["session"], result["client"] = _role_session_and_client(role_name)
+    return result
+
+def _get_creds(role_name: str, trust_principal: str = None) -> dict:
+    cached = _cached_creds(role_name)
+    if cached:
+        return cached.copy()
 
-    # 1. Get account ID
-    account_id = sts_client.get_caller_identity()['Account']
+    with _CREDS_LOCK:
+        # Another thread may have refreshed while we waited for the lock
+        cached = _cached_creds(role_name)
+        if cached:
+            return cached.copy()
+
+        result, expiry = _assume_org_role(
+            role_name, trust_principal or DEFAULT_TRUST_PRINCIPAL
+        )
+        _CREDS_CACHE[role_name] = (result, expiry)
+        return result.copy()
 
-    # 2. Ensure organization exists
+def _ensure_organization(org_client) -> str:
+    """
+    Returns the organization ID, creating the organization if needed.
+    """
     try:
-        org = org_client.describe_organization()['Organization']
-        org_id = org['Id']
+        return org_client.describe_organization()['Organization']['Id']
     except org_client.exceptions.AWSOrganizationsNotInUseException:
         resp = org_client.create_organization(FeatureSet='ALL')
-        org_id = resp['Organization']['Id']
+        return resp['Organization']['Id']
     except ClientError as e:
         if e.response['Error']['Code'] == 'AccessDeniedException':
             raise PermissionError(
@@ -47,43 +123,105 @@ def setup_org_and_get_creds(role_name: str) -> dict:
                 "You must use credentials from the MANAGEMENT ACCOUNT "
                 "that owns the AWS Organization."
             )
+        raise
 
-    # 3. Create or get IAM role
-    role_arn = f"arn:aws:iam::{account_id}:role/{role_name}"
-    trust_policy = {
+@functools.lru_cache(maxsize=None)
+def _trust_policy_json(principal: str) -> str:
+    """
+    AssumeRole trust policy for principal, serialized once per principal.
+    """
+    return json.dumps({
         "Version": "2012-10-17",
         "Statement": [
             {
                 "Effect": "Allow",
                 "Principal": {
-                    "AWS": "arn:aws:iam::123456789012:user/org-admin-user"
+                    "AWS": principal
                 },
                 "Action": "sts:AssumeRole"
             }
         ]
-    }
+    })
+
+def _role_exists(iam_client, role_name: str) -> bool:
+    """
+    True if the IAM role exists; only asks IAM until the role has been seen once.
+    """
+    if role_name in _KNOWN_ROLES:
+        return True
     try:
-        iam_client.create_role(
-            RoleName=role_name,
-            AssumeRolePolicyDocument=json.dumps(trust_policy),
-            Description="Auto-created for mobile app org management"
-        )
+        iam_client.get_role(RoleName=role_name)
     except ClientError as e:
-        if e.response['Error']['Code'] != 'EntityAlreadyExists':
-            raise
+        if e.response['Error']['Code'] == 'NoSuchEntity':
+            return False
+        raise
+    _KNOWN_ROLES.add(role_name)
+    return True
 
-    # Attach policy
-    policy_arn = 'arn:aws:iam::aws:policy/AWSOrganizationsFullAccess'
+def _attach_org_policy(iam_client, role_name: str) -> bool:
+    """
+    Attaches AWSOrganizationsFullAccess. False if the role doesn't exist yet.
+    """
     try:
-        iam_client.attach_role_policy(RoleName=role_name, PolicyArn=policy_arn)
-    except ClientError:
-        pass  # already attached
+        iam_client.attach_role_policy(RoleName=role_name, PolicyArn=ORG_POLICY_ARN)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchEntity':
+            return False
+        # already attached
+    return True
+
+def _assume_org_role(role_name: str, trust_principal: str):
+    """
+    Does the actual STS/Organizations/IAM work → (result dict, expiry epoch).
+    """
+    sts_client = get_client('sts')
+    org_client = get_client('organizations', 'us-east-1')
+    iam_client = get_client('iam')
+
+    # 1-3. Account ID, organization, role lookup and role policy are independent
+    # → run together. attach_role_policy is tried speculatively; it only fails
+    # with NoSuchEntity the first time, before create_role below has made the role.
+    identity_future = _EXECUTOR.submit(sts_client.get_caller_identity)
+    org_future = _EXECUTOR.submit(_ensure_organization, org_client)
+    role_future = _EXECUTOR.submit(_role_exists, iam_client, role_name)
+    attach_future = _EXECUTOR.submit(_attach_org_policy, iam_client, role_name)
+
+    account_id = identity_future.result()['Account']
+    role_arn = f"arn:aws:iam::{account_id}:role/{role_name}"
+    # Fail on a non-management account before touching IAM
+    org_id = org_future.result()
+    if not role_future.result():
+        # Trust principal may reference the account ID, so create_role waits for it
+        try:
+            iam_client.create_role(
+                RoleName=role_name,
+                AssumeRolePolicyDocument=_trust_policy_json(
+                    trust_principal.format(account_id=account_id)
+                ),
+                Description="Auto-created for mobile app org management"
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'EntityAlreadyExists':
+                raise
+        _KNOWN_ROLES.add(role_name)
+
+    if not attach_future.result():
+        # A just-created role can take a few seconds to become visible to IAM
+        for delay in ATTACH_RETRY_DELAYS:
+            time.sleep(delay)
+            if _attach_org_policy(iam_client, role_name):
+                break
+        else:
+            raise RuntimeError(
+                f"Could not attach {ORG_POLICY_ARN} to role {role_name}: "
+                "role still not visible to IAM"
+            )
 
     # 4. Assume role → get temp creds
     resp = sts_client.assume_role(
         RoleArn=role_arn,
         RoleSessionName="mobile-app-session",
-        DurationSeconds=3600
+        DurationSeconds=SESSION_DURATION
     )
     creds = resp['Credentials']
 
@@ -100,7 +238,61 @@ def setup_org_and_get_creds(role_name: str) -> dict:
         "expires_at": creds['Expiration'].strftime("%Y-%m-%dT%H:%M:%SZ")
     }
 
-    return result
+    return result, creds['Expiration'].timestamp()
+
+def get_refreshable_session(role_name: str) -> boto3.Session:
+    """
+    Returns a long-lived boto3.Session for the role whose credentials
+    re-assume the role on their own when close to expiry.
+    """
+    return _role_session_and_client(role_name)[0]
+
+def _role_session_and_client(role_name: str):
+    entry = _SESSIONS.get(role_name)
+    if entry:
+        return entry
+
+    with _SESSIONS_LOCK:
+        entry = _SESSIONS.get(role_name)
+        if entry:
+            return entry
+
+        # Makes sure org + role exist and gives us the first set of creds
+        creds = _get_creds(role_name)
+
+        def _refresh():
+            resp = get_client('sts').assume_role(
+                RoleArn=creds['role_arn'],
+                RoleSessionName="mobile-app-session",
+                DurationSeconds=SESSION_DURATION
+            )
+            new = resp['Credentials']
+            return {
+                "access_key": new['AccessKeyId'],
+                "secret_key": new['SecretAccessKey'],
+                "token": new['SessionToken'],
+                "expiry_time": new['Expiration'].isoformat()
+            }
+
+        refreshable = RefreshableCredentials.create_from_metadata(
+            metadata={
+                "access_key": creds['access_key_id'],
+                "secret_key": creds['secret_access_key'],
+                "token": creds['session_token'],
+                "expiry_time": creds['expires_at']
+            },
+            refresh_using=_refresh,
+            method="sts-assume-role"
+        )
+        botocore_session = botocore.session.get_session()
+        botocore_session._credentials = refreshable
+        botocore_session.set_default_client_config(CLIENT_CONFIG)
+        session = boto3.Session(botocore_session=botocore_session, region_name=creds['region'])
+        # Sessions aren't thread-safe → build the client once, here under the lock
+        entry = (session, session.client('organizations'))
+
+        _SESSIONS[role_name] = entry
+        return entry
 
 
 # ————————————————————————
@@ -12,7 +12,7 @@ def get_org_client():
   
     config = Config(
         region_name='us-east-1',          # Organizations ONLY works here
-        retries={'max_attempts': 10, 'mode': 'standard'},
+        retries={'max_attempts': 10, 'mode': 'adaptive'},
         read_timeout=30,
         connect_timeout=30
     )
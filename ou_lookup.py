@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+ou_lookup.py
+
+- Cached root ID and OU name → ID lookups shared by create_account / create_ou
+- Whole-tree index (all nesting levels) built breadth-first, one thread per parent
+- Caches are keyed by the management account ID, so every role that works
+  on the same organization shares them
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+_ROOT_IDS: Dict[str, str] = {}                # cache_key -> root_id
+_OU_MAPS: Dict[tuple, Dict[str, str]] = {}    # (cache_key, parent_id) -> {name: id}
+_OU_INDEXES: Dict[str, Dict[str, List[str]]] = {}  # cache_key -> {name: [ids]} for the whole tree
+_LOOKUP_LOCK = threading.Lock()
+
+# Sibling listings during the tree walk are independent → fetch them in parallel
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# ListOrganizationalUnitsForParent returns at most 20 per page (default 10)
+OU_PAGE_SIZE = 20
+
+
+def list_ou_map(org_client, parent_id: str) -> Dict[str, str]:
+    """
+    Uncached: page through the OUs directly under parent_id → {name: id}.
+    """
+    paginator = org_client.get_paginator("list_organizational_units_for_parent")
+    ou_map = {}
+    for page in paginator.paginate(
+        ParentId=parent_id, PaginationConfig={"PageSize": OU_PAGE_SIZE}
+    ):
+        for ou in page.get("OrganizationalUnits", []):
+            ou_map[ou["Name"]] = ou["Id"]
+    return ou_map
+
+
+def get_root_id(org_client, cache_key: str) -> str:
+    """
+    Return the organization root ID, calling list_roots only once per cache_key.
+    """
+    root_id = _ROOT_IDS.get(cache_key)
+    if root_id:
+        return root_id
+
+    root_id = org_client.list_roots()["Roots"][0]["Id"]
+    with _LOOKUP_LOCK:
+        _ROOT_IDS[cache_key] = root_id
+    return root_id
+
+
+def cached_ou_id(cache_key: str, parent_id: str, ou_name: str):
+    """
+    ID of ou_name under parent_id if the parent's OU map is already cached, else None.
+    Never calls AWS.
+    """
+    ou_map = _OU_MAPS.get((cache_key, parent_id))
+    return ou_map.get(ou_name) if ou_map is not None else None
+
+
+def refresh_ou_map(org_client, cache_key: str, parent_id: str) -> Dict[str, str]:
+    """
+    Re-list the OUs under parent_id and replace the (possibly stale) cached map.
+    """
+    ou_map = list_ou_map(org_client, parent_id)
+    with _LOOKUP_LOCK:
+        _OU_MAPS[(cache_key, parent_id)] = ou_map
+        index = _OU_INDEXES.get(cache_key)
+        if index is not None:
+            for name, ou_id in ou_map.items():
+                _index_add(index, name, ou_id)
+    return ou_map
+
+
+def build_ou_index(
+    org_client, root_id: str, cache_key: str = None
+) -> Dict[str, List[str]]:
+    """
+    Uncached: walk the whole OU tree level by level → {name: [ids]}.
+    OU names are only unique per parent; each name keeps the IDs found at the
+    shallowest level it appears on, so more than one ID means it's ambiguous.
+    With cache_key, every per-parent listing is also stored in the OU map cache.
+    """
+    index = {}
+    level = [root_id]
+    while level:
+        maps = list(_EXECUTOR.map(lambda parent: list_ou_map(org_client, parent), level))
+        next_level = []
+        level_hits = {}
+        for parent_id, ou_map in zip(level, maps):
+            if cache_key:
+                with _LOOKUP_LOCK:
+                    _OU_MAPS.setdefault((cache_key, parent_id), ou_map)
+            for name, ou_id in ou_map.items():
+                if name not in index:
+                    level_hits.setdefault(name, []).append(ou_id)
+                next_level.append(ou_id)
+        index.update(level_hits)
+        level = next_level
+    return index
+
+
+def get_ou_index(org_client, cache_key: str) -> Dict[str, List[str]]:
+    """
+    Return {name: [ids]} for every OU in the organization, walking the tree only once.
+    """
+    index = _OU_INDEXES.get(cache_key)
+    if index is not None:
+        return index
+
+    index = build_ou_index(org_client, get_root_id(org_client, cache_key), cache_key)
+    with _LOOKUP_LOCK:
+        _OU_INDEXES[cache_key] = index
+    return index
+
+
+def invalidate_ou_index(cache_key: str) -> None:
+    """
+    Forget the tree index and per-parent OU maps for cache_key (root ID is kept).
+    """
+    with _LOOKUP_LOCK:
+        _OU_INDEXES.pop(cache_key, None)
+        for key in [key for key in _OU_MAPS if key[0] == cache_key]:
+            del _OU_MAPS[key]
+
+
+def lookup_ou_id(org_client, cache_key: str, ou_name: str) -> str:
+    """
+    Find ou_name anywhere in the organization via the cached index.
+    A miss (or ambiguity) may just mean the index is stale, so rebuild it
+    once before raising ValueError.
+    """
+    try:
+        return find_ou_id(get_ou_index(org_client, cache_key), ou_name)
+    except ValueError:
+        invalidate_ou_index(cache_key)
+        return find_ou_id(get_ou_index(org_client, cache_key), ou_name)
+
+
+def remember_ou(cache_key: str, parent_id: str, ou_name: str, ou_id: str) -> None:
+    """
+    Record a newly created OU so the cached maps stay valid without re-listing.
+    """
+    with _LOOKUP_LOCK:
+        ou_map = _OU_MAPS.get((cache_key, parent_id))
+        if ou_map is not None:
+            ou_map[ou_name] = ou_id
+        index = _OU_INDEXES.get(cache_key)
+        if index is not None:
+            _index_add(index, ou_name, ou_id)
+
+
+def _index_add(index: Dict[str, List[str]], ou_name: str, ou_id: str) -> None:
+    # Depth of a late addition is unknown → treat a reused name as ambiguous
+    ids = index.setdefault(ou_name, [])
+    if ou_id not in ids:
+        ids.append(ou_id)
+
+
+def find_ou_id(index: Dict[str, List[str]], ou_name: str) -> str:
+    """
+    Look ou_name up in an OU index; ValueError if it's missing or ambiguous.
+    """
+    ids = index.get(ou_name)
+    if not ids:
+        raise ValueError(f"OU named '{ou_name}' not found in the organization.")
+    if len(ids) > 1:
+        raise ValueError(
+            f"OU name '{ou_name}' is ambiguous ({', '.join(ids)}); pass the OU ID instead."
+        )
+    return ids[0]